@@ -26,6 +26,13 @@
 #
 #               get_module_io.py --filename accumulator.v
 #
+# Several module files can be processed in one go with the '--filenames' switch, followed
+# by the names of the files (or glob patterns). If no names are given, they are read in
+# from stdin, one per line:
+#
+#               get_module_io.py --filenames "rtl/*.v"
+#               find rtl -name "*.sv" | get_module_io.py --filenames
+#
 
 
 # Modules that will be useful
@@ -34,6 +41,8 @@ import os
 import sys
 import re
 import csv
+import glob
+import mmap
 
 # ==== Some General-info Strings ====
 # Tags - define these here so they can be quickly and easily changed
@@ -44,9 +53,10 @@ infoTag    = """\t***Info: """
 # Standard help & error messages
 helpMsg    = infoTag + """The path to the Verilog or SystemVerilog module description should be
 given after using the '--filename' switch."""
+filenamesHelpMsg = infoTag + """The paths (or glob patterns) of several Verilog or SystemVerilog module descriptions
+can be given after using the '--filenames' switch. If no paths are given, they are read in from stdin."""
 noArgsMsg  = errorTag + """No input arguments were specified. Please use '--filename' followed
 \tby the name of the module to be instantiated."""
-noSuchFileMsg   = errorTag + """The module file '{}' could not be located - double-check the name or file path."""
 fileReadSuccess = successTag + """The module file was read in successfully."""
 fileReadError   = errorTag + """The module file could not be read in successfully."""
 moduleNameNotIdentified = errorTag + """The module name could not be identified. Please ensure that you have used
@@ -69,17 +79,24 @@ noParamsFound       = infoTag + """No parameters were identified for this module
 noInputsIdentified  = errorTag + """No module inputs were identified."""
 noOutputsIdentified = errorTag + """No module outputs were identified."""
 
+# The messages below are only built when they are needed
+# Missing module file message
+def noSuchFileMsg(moduleFileName):
+    return errorTag + f"""The module file '{moduleFileName}' could not be located - double-check the name or file path."""
+
 # Instantiated module print-out message
-jobDoneMsg = """
+def jobDoneMsg(moduleName, outputCsvFileName):
+    return f"""
 \n\n\t===========================================================================================
-\t\tThe I/O list for {} can be found in {}!
+\t\tThe I/O list for {moduleName} can be found in {outputCsvFileName}!
 \t==========================================================================================="""
 
 # Goodbye message
-goodbyeMsg = """
+def goodbyeMsg(outputCsvFileName):
+    return f"""
 \t===========================================================================================
 \t\tYou can email this .CSV file to yourself by running:
-\t\t mail -a {} <your_email_address>
+\t\t mail -a {outputCsvFileName} <your_email_address>
 
 \t\tEnter a subject for the email and then press ctrl + D
 \t==========================================================================================="""
@@ -91,98 +108,151 @@ inputPortsHeader = """// ==== Inputs ===="""
 outputPortsHeader = """// ==== Outputs ====\n\t"""
 paramsHeader = """// ==== Parameters ===="""
 
+# Buffer size used when writing out the .csv file
+fileBufferSize = 65536 # 64 KiB
+
+# ==== Define the Patterns to Look For ====
+# These are compiled once, when the script is loaded (or imported). They are bytes
+# patterns, as they are applied to the memory-mapped module file rather than to a str.
+# Comments and string literals are stripped from the module contents before any of the
+# other patterns are applied, so they can never be mistaken for part of the module
+commentsPattern      = re.compile(rb'//[^\n]*|/\*.*?\*/|"(?:\\.|[^"\\\n])*"', re.S)
+moduleNamePattern    = re.compile(rb'\bmodule\s+(?:\$\[PREFIX\])?([a-zA-Z\_0-9]+)[\n\s]*#?[\n\s]*\(')
+parenPattern         = re.compile(rb'[()]')
+portListPattern      = re.compile(rb'\s*\(')
+moduleParamsPattern  = re.compile(rb'\bparameter\b\s*(?:\[[`a-zA-Z0-9\_\-\+\:\*/ ]+\]\s*){0,2}\s*([a-zA-Z\_0-9]+)\s*=')
+# A dimension is either a range in square brackets (e.g., [7:0]) or a template placeholder
+# (e.g., $${WIDTH} or $[WIDTH]). The packed and unpacked dimensions share the one subpattern.
+dimensionSubpattern  = rb'(?:\[[`a-zA-Z0-9\_\-\+\:\*/ ]+\]|\$\$\{[a-zA-Z\_]+\}|\$\[[a-zA-Z\_]+\])'
+moduleIOPattern      = re.compile(rb'\b(?P<dir>input|output)\b\s*(?P<type>wire\b|reg\b)?\s*(?P<dim1>' + dimensionSubpattern + rb')?\s*(?P<dim2>' + dimensionSubpattern + rb')?\s*(?P<name>[a-zA-Z\_0-9\$\{\}]+)\s*,?')
+
 # Function to handle the input arguments
 def parsingArguments():
     parser = argparse.ArgumentParser(description = "The file containing the Verilog or SystemVerilog module description.")
     parser.add_argument('--filename', type = str, help = helpMsg)
+    parser.add_argument('--filenames', type = str, nargs = '*', help = filenamesHelpMsg)
     return parser.parse_args()
 
-if __name__ == "__main__":
-    args = parsingArguments() # parse the input arguments (if there are any)
-    if len(sys.argv) == 1:
-        print(noArgsMsg)
-        exit()
-    moduleFileName = args.filename # get the file name (or path) from the input arguments
+# Function to find the parenthesis that closes the one at openIndex. It hops from one
+# parenthesis to the next, keeping track of the depth, and returns the index of the
+# closing parenthesis (or None if the parentheses are unbalanced).
+def findClosingParen(moduleContents, openIndex):
+    depth = 0
+    for match in parenPattern.finditer(moduleContents, openIndex):
+        depth += 1 if match.group() == b'(' else -1
+        if depth == 0:
+            return match.start()
+    return None
+
+# Function to extract the I/O list of a single module file. The list is written to
+# <module_name>_io.csv and the name of that .csv file is returned (or None if the
+# module could not be processed). It can be called over a batch of files from
+# within the one Python process, e.g.:
+#
+#       from get_module_io import getModuleIO
+#       for f in files: getModuleIO(f)
+#
+def getModuleIO(moduleFileName):
     moduleFileType = os.path.splitext(moduleFileName)[1] # get the file extension type (either ".v" or ".sv")
     # ==== Check if the File (path) Exists ====
     if os.path.isfile(moduleFileName) is False:
-        print(noSuchFileMsg.format(moduleFileName))
-        exit()
+        print(noSuchFileMsg(moduleFileName))
+        return None
     
     # ==== Try to Read the Module File in ====
-    with open(moduleFileName) as p:
+    # The file is memory-mapped, so the comments and strings are stripped out of it
+    # in place, without first copying (and decoding) the whole file into a str
+    with open(moduleFileName, 'rb') as p:
         try:
-            moduleContents = p.read() # read the file into a string
+            with mmap.mmap(p.fileno(), 0, access = mmap.ACCESS_READ) as moduleMap:
+                moduleContents = commentsPattern.sub(b' ', moduleMap)
             print(fileReadSuccess)
         except:
             print(fileReadError)
-            exit()
+            return None
     
-    # ==== Define the Patterns to Look For ====
-    moduleNamePattern    = re.compile(r'(?<!(?: |/|[a-zA-Z\_]))module\s+(?:\$\[PREFIX\])?([a-zA-Z\_0-9]+)[\n\s]*#?[\n\s]*\(')
-    moduleParamsPattern  = re.compile(r'(?<!(?: |/|[a-zA-Z\_]))parameter\s*(?:\[[`a-zA-Z0-9\_\-\+\:\*/ ]+\]\s*){0,2}\s*([a-zA-Z\_0-9]+)\s*=')
-    moduleInputsPattern  = re.compile(r'(?<!(?: |/|[a-zA-Z\_]))(input){1}\s+(wire\b|reg\b)?\s*(\[[`a-zA-Z0-9\_\-\+\:\*/ ]+\]|\$\$\{[a-zA-Z\_]+\}|\$\[[a-zA-Z\_]+\])?\s*(\[[`a-zA-Z0-9\_\-\+\:\*/ ]+\]|\$\$\{[a-zA-Z\_]+\}|\$\[[a-zA-Z\_]+\])?\s*([a-zA-Z\_0-9\$\{\}]+)\s*,?')
-    moduleOutputsPattern  = re.compile(r'(?<!(?: |/|[a-zA-Z\_]))(output){1}\s+(wire\b|reg\b)?\s*(\[[`a-zA-Z0-9\_\-\+\:\*/ ]+\]|\$\$\{[a-zA-Z\_]+\}|\$\[[a-zA-Z\_]+\])?\s*(\[[`a-zA-Z0-9\_\-\+\:\*/ ]+\]|\$\$\{[a-zA-Z\_]+\}|\$\[[a-zA-Z\_]+\])?\s*([a-zA-Z\_0-9\$\{\}]+)\s*,?')
-
     # ==== Extract the Module Name first ====
-    matches = re.findall(moduleNamePattern, moduleContents)
+    matches = list(moduleNamePattern.finditer(moduleContents))
     # ==== Check that only one Match was found for the Module Name ====
     if (len(matches) != 1):
         print(moduleNameNotIdentified)
-        exit()
+        return None
     else:
-        moduleName = matches[0] # store the module name
+        moduleName = matches[0].group(1).decode() # store the module name
 
-    # ==== Extract the Module Inputs ====
-    matches = re.findall(moduleInputsPattern, moduleContents)
-    if (len(matches) == 0): # if there were no matches
-        print(noInputsIdentified) # print a message saying that no module inputs were found
+    # ==== Find the Module Header ====
+    # The ports of a module are (normally) declared in its header, i.e., between the
+    # parentheses that follow the module name and its parameter list (if it has one).
+    # Only that region needs to be searched for the inputs and outputs.
+    headerStart = matches[0].end() - 1 # the index of the 1st opening parenthesis
+    headerEnd = findClosingParen(moduleContents, headerStart)
+    if headerEnd is not None and b'#' in matches[0].group(0):
+        # the 1st set of parentheses held the parameters - the ports are in the set that
+        # directly follows it (if there is no such set, the module has no port list)
+        portList = portListPattern.match(moduleContents, headerEnd + 1)
+        if portList is None:
+            headerStart = headerEnd = None
+        else:
+            headerStart = portList.end() - 1
+            headerEnd = findClosingParen(moduleContents, headerStart)
+    if headerStart is None:
+        moduleHeader = b'' # there is no port list
+    elif headerEnd is None:
+        moduleHeader = moduleContents # the parentheses are unbalanced, so search everything
     else:
-        moduleInputs = matches # capture the list of module inputs
-        numInputs = len(matches)
-    
-    # ==== Extract the Module Outputs ====
-    matches = re.findall(moduleOutputsPattern, moduleContents)
-    if (len(matches) == 0): # if there were no matches
+        moduleHeader = moduleContents[headerStart:headerEnd] # this includes the opening parenthesis
+
+    # ==== Extract the Module Inputs and Outputs ====
+    # A single pass over the module header picks up both the inputs and the
+    # outputs; the rows of the .csv file are written straight from the matches.
+    moduleIOMatches = list(moduleIOPattern.finditer(moduleHeader))
+    if len(moduleIOMatches) == 0 and moduleHeader[1:].strip():
+        # the port list only names the ports (e.g., (a, b, c)), so they must be declared
+        # in the module body instead (Verilog-1995 style). An empty port list, (), means
+        # the module has no ports at all.
+        moduleIOMatches = list(moduleIOPattern.finditer(moduleContents))
+    numInputs = sum(1 for match in moduleIOMatches if match["dir"] == b"input")
+    numOutputs = len(moduleIOMatches) - numInputs
+    if (numInputs == 0): # if there were no matches
+        print(noInputsIdentified) # print a message saying that no module inputs were found
+    if (numOutputs == 0): # if there were no matches
         print(noOutputsIdentified) # print a message saying that no module outputs were found
-    else:
-        moduleOutputs = matches # capture the list of module outputs
-        numOutputs = len(matches)
-
-    # ==== Form the List of Inputs and Outputs ====
-    # The dictionaries below will store the information.
-    inputDictionary = {}
-    outputDictionary = {}
-    for i in range(0, numInputs):
-        signalType = moduleInputs[i][1] # the 2nd thing that will match in a port declaration is the signal type (i.e., wire or reg)
-        signalDimension = moduleInputs[i][2] + moduleInputs[i][3] # after the signal type comes the signal dimension
-        signalName = moduleInputs[i][4] # and after the signal dimension comes the signal name
-        inputDictionary[signalName] = {"signalType": signalType,
-                "signalDimension": signalDimension
-                } 
-    for i in range(0, numOutputs):
-        signalType = moduleOutputs[i][1]
-        signalDimension = moduleOutputs[i][2] + moduleOutputs[i][3]
-        signalName = moduleOutputs[i][4]
-        outputDictionary[signalName] = {"signalType": signalType,
-                "signalDimension": signalDimension
-                }
 
     # ==== Write the I/O List to an Output .CSV File ====
+    # The ports are listed in the order in which they are declared in the module.
     outputCsvFileName = moduleName + "_io.csv"
-    with open(outputCsvFileName, 'w') as p:
+    with open(outputCsvFileName, 'w', newline = '', buffering = fileBufferSize) as p:
         writer = csv.writer(p)
         writer.writerow(["Signal Name", "Input/Output", "Signal Type", "Dimension"])
-        for key, value in inputDictionary.items():
-            signalType = value["signalType"]
-            signalDimension = value["signalDimension"]
-            writer.writerow([key, "Input", signalType, signalDimension])
-        for key, value in outputDictionary.items():
-            signalType = value["signalType"]
-            signalDimension = value["signalDimension"]
-            writer.writerow([key, "Output", signalType, signalDimension])
+        # The matched bytes only ever contain ASCII characters, so they decode cleanly
+        rows = ([match["name"].decode(),
+                "Input" if match["dir"] == b"input" else "Output",
+                (match["type"] or b"").decode(),
+                ((match["dim1"] or b"") + (match["dim2"] or b"")).decode()
+                ] for match in moduleIOMatches)
+        writer.writerows(rows) # write all of the rows in one go
 
     # ==== Inform the User of where the List is ====
-    print(jobDoneMsg.format(moduleName, outputCsvFileName))
-    print(goodbyeMsg.format(outputCsvFileName))
+    print(jobDoneMsg(moduleName, outputCsvFileName))
+    print(goodbyeMsg(outputCsvFileName))
+    return outputCsvFileName
+
+if __name__ == "__main__":
+    args = parsingArguments() # parse the input arguments (if there are any)
+    if len(sys.argv) == 1:
+        print(noArgsMsg)
+        exit()
+    # ==== Gather the Module File Names ====
+    moduleFileNames = []
+    if args.filename is not None:
+        moduleFileNames.append(args.filename) # get the file name (or path) from the input arguments
+    if args.filenames is not None:
+        if len(args.filenames) == 0 or args.filenames == ["-"]:
+            moduleFileNames.extend(line.strip() for line in sys.stdin if line.strip()) # read the names in from stdin
+        else:
+            for pattern in args.filenames:
+                # expand any (quoted) glob patterns, keeping the name as-is if nothing matched
+                moduleFileNames.extend(sorted(glob.glob(pattern)) or [pattern])
+    for moduleFileName in moduleFileNames:
+        getModuleIO(moduleFileName)
     exit()